@@ -1,12 +1,16 @@
+import sys
+import numpy as np
 import pandas as pd
-from supabase import create_client
-from dotenv import load_dotenv
-import os
+from data_loader import load_combined
 
-load_dotenv()
+try:
+    from numba import njit
+except ImportError:  # numba ist optional, ohne JIT läuft der Kernel als NumPy-Code
+    def njit(*args, **kwargs):
+        return lambda f: f
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# vorberechnete Balken für die Verteilungen (1 Zeichen je 3 %, max. 100 %)
+BARS = ["|" * i for i in range(100 // 3 + 1)]
 
 
 def main():
@@ -18,7 +22,9 @@ def main():
     
     generate_csv(data, "data.csv")
     
-    best_track, stats = recommend_track(data)
+    # für das Scoring nur die benötigten Spalten, der volle Datensatz bleibt für die Zielgruppenanalyse
+    score_input = data[['track_name', 'artist_name', 'total_streams', 'total_saves', 'skip_rate']]
+    best_track, stats = recommend_track(score_input)
     generate_csv(stats, "track_scores.csv")
     
     audience_df = audience_analysis(data, best_track['track_name'], best_track['artist_name'])
@@ -53,19 +59,41 @@ def generate_csv(df, filename):
     df.to_csv(filename, index=False, encoding='utf-8')
 
 
-def print_distribution(df, group_col, total_streams):
-    groups = sorted(df[group_col].unique())
-    for group in groups:
-        streams_group = df[df[group_col] == group]["total_streams"].sum()
-        pct = round(streams_group / total_streams * 100, 1)
-        bars = "|" * int(pct / 3)
+# Scoring-Kernel auf float64-Arrays (JIT-kompiliert, falls numba installiert ist);
+# fastmath ohne nnan/ninf (nanmean/nansum bleiben korrekt) und ohne arcp
+# (Divisionen bleiben exakt wie in pandas)
+@njit(cache=True, fastmath={"reassoc", "contract"})
+def score_tracks(streams, saves, skip):
+    save_rate = saves / streams
+    skip_rate = skip / 100
+    
+    # Normierung auf Durchschnitt bzw. Gesamtstreams im Set
+    save_rate_avg = np.nanmean(save_rate)
+    skip_rate_avg = np.nanmean(skip_rate)
+    save_rate_norm = save_rate / save_rate_avg
+    skip_rate_norm = skip_rate / skip_rate_avg
+    stream_share = streams / np.nansum(streams)
+    
+    # Score = 0.5 * SaveRateNorm - 0.3 * SkipRateNorm + 0.2 * StreamShare
+    total_score = 0.5 * save_rate_norm - 0.3 * skip_rate_norm + 0.2 * stream_share
+    return (save_rate, skip_rate, save_rate_norm, skip_rate_norm, stream_share,
+            total_score, save_rate_avg, skip_rate_avg)
+
+
+def print_distribution(streams_by_group, group_col, total_streams):
+    # Anteile vektorisiert berechnen, Schleife nur für die Ausgabe
+    shares = (streams_by_group / total_streams * 100).round(1)
+    out = []
+    for group, pct in shares.items():
+        bars = BARS[int(pct / 3)]
         
         if group_col == 'gender':
             display_text = get_german_gender_text(group, "normal")
         else:
             display_text = group
             
-        print(f"{display_text:10} {pct:5.1f}% {bars}")
+        out.append(f"{display_text:10} {pct:5.1f}% {bars}")
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 #---Aufgabe 1.1
@@ -74,27 +102,7 @@ def load_data():
     print_section("1. Daten laden & kombinieren")
     
     try:
-        client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("Supabase-Verbindung succsessful")
-        
-        tracks_perf_data = client.table("sme_track_data").select("*").execute().data
-        tracks_meta_data = client.table("sme_track").select("*").execute().data
-        artists_data = client.table("sme_artist").select("*").execute().data
-        
-        tracks_perf = pd.DataFrame(tracks_perf_data)
-        tracks_meta = pd.DataFrame(tracks_meta_data)
-        artists = pd.DataFrame(artists_data)
-        
-        print("Tracks Performance:", len(tracks_perf))
-        print("Tracks Meta:", len(tracks_meta))
-        print("Artists:", len(artists))
-        
-        # Tabellen kombinieren
-        tracks = pd.merge(tracks_perf, tracks_meta[['isrc','name','artist_id','release_date']],
-                            on='isrc', how='left')
-        artists_tracks = pd.merge(tracks, artists[['artist_id','artist_name']],
-                            on='artist_id', how='left')
-        artists_tracks = artists_tracks.rename(columns={'name': 'track_name'})
+        artists_tracks = load_combined()
         
         print("Kombinierte Datensätze:", len(artists_tracks))
         generate_csv(artists_tracks, "combined_tracks.csv")
@@ -111,53 +119,53 @@ def load_data():
 def recommend_track(df):
     print_section("2. Track-Empfehlung")
     
-    # Aggregieren auf Track-Ebene
-    grouped = df.groupby(['track_name', 'artist_name']).agg({
+    # Aggregieren auf Track-Ebene (ohne Schlüsselsortierung, sortiert wird nach Score)
+    grouped = df.groupby(['track_name', 'artist_name'], observed=True, sort=False).agg({
         'total_streams': 'sum',
         'total_saves': 'sum',
         'skip_rate': 'mean'
     }).reset_index()
     
-    
-    grouped['save_rate'] = grouped['total_saves'] / grouped['total_streams']
-    
-    grouped['skip_rate'] = grouped['skip_rate'] / 100
-    
-    # Normierungskonstanten
-    SAVE_RATE_AVG = grouped['save_rate'].mean()  # Durchschnitt Save-Rate im Set
-    SKIP_RATE_AVG = grouped['skip_rate'].mean()  # Durchschnitt Skip-Rate im Set
-    TOTAL_STREAMS_ALL = grouped['total_streams'].sum()  # Gesamtstreams aller Tracks
-    
-    # Scoring Formel
-    grouped['save_rate_norm'] = grouped['save_rate'] / SAVE_RATE_AVG
-    grouped['skip_rate_norm'] = grouped['skip_rate'] / SKIP_RATE_AVG
-    grouped['stream_share'] = grouped['total_streams'] / TOTAL_STREAMS_ALL
-    
-    # Score = 0.5 * SaveRateNorm - 0.3 * SkipRateNorm + 0.2 * StreamShare
-    grouped['total_score'] = (0.5 * grouped['save_rate_norm'] - 
-                              0.3 * grouped['skip_rate_norm'] + 
-                              0.2 * grouped['stream_share'])
-    
-    # Sortieren
+    # SAVE_RATE_AVG / SKIP_RATE_AVG: Normierungskonstanten aus dem Kernel (für die Begründung)
+    (save_rate, skip_rate, save_rate_norm, skip_rate_norm, stream_share,
+     total_score, SAVE_RATE_AVG, SKIP_RATE_AVG) = score_tracks(
+        grouped['total_streams'].to_numpy(dtype=np.float64),
+        grouped['total_saves'].to_numpy(dtype=np.float64),
+        grouped['skip_rate'].to_numpy(dtype=np.float64))
+    
+    # Spalten für Ausgabe und CSV in einem Schritt übernehmen
+    grouped = grouped.assign(skip_rate=skip_rate,
+                             save_rate=save_rate,
+                             save_rate_norm=save_rate_norm,
+                             skip_rate_norm=skip_rate_norm,
+                             stream_share=stream_share,
+                             total_score=total_score)
+    
+    # Empfehlung direkt über das Maximum im Score-Array bestimmen
+    # (sind alle Scores NaN, z.B. ohne Skip-Raten, wie beim Sortieren die erste Zeile)
+    best_i = 0 if np.isnan(total_score).all() else int(np.nanargmax(total_score))
+    best = grouped.iloc[best_i]
+    
+    # Sortieren (nur für Ranking-Ausgabe und CSV)
     grouped = grouped.sort_values('total_score', ascending=False).reset_index(drop=True)
     
     print("-"*40)
     print("Tracks im Vergleich: ")
     print("-"*40)
     
-    for i in range(len(grouped)):
-        row = grouped.iloc[i]
-        print("\n" + f"{i+1}.", row['track_name'], "-", row['artist_name'])
-        print("   Streams:", format_number(row['total_streams']))
-        print(f"   Stream-Share: {row['stream_share']:.4f} ({row['stream_share']*100:.2f}%)")
-        print(f"   Save-Rate: {row['save_rate']:.3f} ({row['save_rate']*100:.1f}%)")
-        print(f"   Save-Rate-Norm: {row['save_rate_norm']:.4f}")
-        print(f"   Skip-Rate: {row['skip_rate']:.4f} ({row['skip_rate']*1000:.0f}‰)")
-        print(f"   Skip-Rate-Norm: {row['skip_rate_norm']:.4f}")
-        print(f"   Score: {row['total_score']:.4f}")
-    
-    best = grouped.iloc[0]
-  
+    # Ausgabe sammeln und einmal schreiben
+    out = []
+    for i, row in enumerate(grouped.itertuples(index=False)):
+        out.append("\n" + f"{i+1}. {row.track_name} - {row.artist_name}")
+        out.append(f"   Streams: {format_number(row.total_streams)}")
+        out.append(f"   Stream-Share: {row.stream_share:.4f} ({row.stream_share*100:.2f}%)")
+        out.append(f"   Save-Rate: {row.save_rate:.3f} ({row.save_rate*100:.1f}%)")
+        out.append(f"   Save-Rate-Norm: {row.save_rate_norm:.4f}")
+        out.append(f"   Skip-Rate: {row.skip_rate:.4f} ({row.skip_rate*1000:.0f}‰)")
+        out.append(f"   Skip-Rate-Norm: {row.skip_rate_norm:.4f}")
+        out.append(f"   Score: {row.total_score:.4f}")
+    sys.stdout.write("\n".join(out) + "\n")
+    
     print(" \nFokus für nächsten Monat:")
     print(f"**{best['track_name']}** von **{best['artist_name']}**")
     print(f"Score: {best['total_score']:.4f}")
@@ -179,16 +187,21 @@ def audience_analysis(df, track_name, artist_name):
     total_streams = track_df['total_streams'].sum()
     print(f"Track: {track_name} von {artist_name}, Gesamt-Streams: {format_number(total_streams)}")
     
+    # Streams pro (Altersgruppe, Geschlecht) einmal gruppieren,
+    # Alters- und Geschlechterverteilung daraus aufsummieren
+    grouped = track_df.groupby(['age_group', 'gender'], observed=True)['total_streams'].sum()
+    
     # Altersverteilung
     print("\nAltersverteilung:")
-    print_distribution(track_df, 'age_group', total_streams)
+    print_distribution(grouped.groupby(level='age_group', observed=True).sum(),
+                       'age_group', total_streams)
     
     # Geschlechterverteilung
     print("\nGeschlechtsverteilung:")
-    print_distribution(track_df, 'gender', total_streams)
+    print_distribution(grouped.groupby(level='gender', observed=True).sum(),
+                       'gender', total_streams)
     
     # Kernzielgruppe
-    grouped = track_df.groupby(['age_group', 'gender'])['total_streams'].sum()
     age_gender_pct = round(grouped / total_streams * 100, 1)
     
     primary = age_gender_pct.idxmax()
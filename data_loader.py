@@ -0,0 +1,111 @@
+import pandas as pd
+from supabase import create_client
+from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow ist optional
+    pa = None
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# nur die Spalten laden, die in der Analyse verwendet werden
+TABLE_COLUMNS = {
+    "sme_track_data": "isrc,total_streams,total_saves,skip_rate,age_group,gender",
+    "sme_track": "isrc,name,artist_id,release_date",
+    "sme_artist": "artist_id,artist_name",
+}
+
+# führende Sortierspalten je Tabelle für das seitenweise Laden; nicht garantiert
+# eindeutig, die übrigen Spalten werden daher als Tiebreaker angehängt (page_order)
+TABLE_KEYS = {
+    "sme_track_data": ("isrc", "age_group", "gender"),
+    "sme_track": ("isrc",),
+    "sme_artist": ("artist_id",),
+}
+
+# PostgREST liefert nur begrenzt viele Zeilen pro Antwort (Standard: 1000)
+PAGE_SIZE = 1000
+
+
+# Client nur einmal pro Prozess erzeugen, damit alle Abfragen denselben
+# HTTP-Connection-Pool (keep-alive) nutzen
+@lru_cache(maxsize=1)
+def get_client():
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+# kombinierte Daten nur einmal pro Prozess laden, alle Skripte teilen sich
+# das Ergebnis (nicht verändern, sondern bei Bedarf kopieren)
+@lru_cache(maxsize=1)
+def load_combined():
+    client = get_client()
+    print("Supabase-Verbindung succsessful")
+    
+    artists_tracks = combine_tables(client)
+    
+    # Gruppierungsspalten als Kategorien (Integer-Codes statt Strings)
+    for col in ('age_group', 'gender', 'track_name', 'artist_name'):
+        artists_tracks[col] = artists_tracks[col].astype('category')
+    
+    return artists_tracks
+
+
+def page_order(table):
+    # Schlüsselspalten zuerst, dann alle übrigen Spalten: totale Ordnung bis auf
+    # identische Zeilen, die ohnehin austauschbar sind
+    keys = TABLE_KEYS[table]
+    return keys + tuple(c for c in TABLE_COLUMNS[table].split(",") if c not in keys)
+
+
+def fetch_all(query, order, page=PAGE_SIZE):
+    # seitenweise laden, bis keine Zeilen mehr kommen; die Sortierung muss total
+    # sein, sonst können Zeilen doppelt oder gar nicht kommen
+    offset = 0
+    while True:
+        request = query()
+        for col in order:
+            request = request.order(col)
+        rows = request.range(offset, offset + page - 1).execute().data
+        if not rows:
+            return
+        yield from rows
+        offset += len(rows)
+
+
+def to_dataframe(rows):
+    # Arrow baut die Spalten in C++ statt zeilenweise über Python-Dicts
+    if pa is None or not rows:
+        return pd.DataFrame(rows)
+    return pa.Table.from_pylist(rows).to_pandas()
+
+
+def combine_tables(client):
+    # die drei Abfragen parallel ausführen (netzwerkgebunden)
+    with ThreadPoolExecutor(max_workers=len(TABLE_COLUMNS)) as ex:
+        tracks_perf_data, tracks_meta_data, artists_data = ex.map(
+            lambda t: list(fetch_all(lambda: client.table(t).select(TABLE_COLUMNS[t]),
+                                     page_order(t))),
+            TABLE_COLUMNS)
+    
+    tracks_perf = to_dataframe(tracks_perf_data)
+    tracks_meta = to_dataframe(tracks_meta_data)
+    artists = to_dataframe(artists_data)
+    
+    print("Tracks Performance:", len(tracks_perf))
+    print("Tracks Meta:", len(tracks_meta))
+    print("Artists:", len(artists))
+    
+    # Tabellen kombinieren (Left-Join über die indexierten Schlüssel)
+    tracks_meta = tracks_meta.set_index('isrc')
+    artists = artists.set_index('artist_id')
+    artists_tracks = (tracks_perf
+                      .join(tracks_meta[['name','artist_id','release_date']], on='isrc')
+                      .join(artists[['artist_name']], on='artist_id'))
+    return artists_tracks.rename(columns={'name': 'track_name'})